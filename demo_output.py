@@ -5,38 +5,298 @@
 
 本脚本用于演示优化后的彩色输出效果，无需实际扫描即可查看界面效果。
 
+各演示段均为生成器，产出 (文本, 之后的停顿秒数)；由 _drive 统一消费，
+相邻且之间没有停顿的文本合并为一次写入。
+
 使用方法:
     python demo_output.py
+    DEMO_SPEED=0 python demo_output.py   # 跳过停顿，只测输出开销
 """
 
+import io
+import os
+import re
 import time
 import sys
+import unicodedata
+from itertools import chain
 from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# 演示段产出的单元：(文本, 之后的停顿秒数)
+Chunk = Tuple[str, float]
+
+# 输出被重定向到文件/管道时不生成任何颜色控制码，省去colorama逐字符解析剥离
+_TTY = sys.stdout is not None and sys.stdout.isatty()
+
+# script.py 在首次使用时才导入（见 _s），单纯导入本模块不会触发colorama初始化
+_script = None
+
+# 预先拼接好的颜色+样式控制码：属性名 -> (Fore颜色, 是否加粗)
+_COLOR_SPECS = {
+    'CYAN_B': ('CYAN', True),
+    'MAGENTA_B': ('MAGENTA', True),
+    'GREEN_B': ('GREEN', True),
+    'YELLOW_B': ('YELLOW', True),
+    'RED_B': ('RED', True),
+    'CYAN': ('CYAN', False),
+    'GREEN': ('GREEN', False),
+    'YELLOW': ('YELLOW', False),
+    'MAGENTA': ('MAGENTA', False),
+    'WHITE': ('WHITE', False),
+}
+
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+
+class _Colors:
+    """颜色控制码集合（非终端时全部为空串）"""
+    
+    __slots__ = tuple(_COLOR_SPECS) + ('RESET',)
+    
+    def __init__(self, script):
+        self.RESET = script.Style.RESET_ALL if _TTY else ''
+        for name, (color, bright) in _COLOR_SPECS.items():
+            if not _TTY:
+                setattr(self, name, '')
+                continue
+            value = getattr(script.Fore, color)
+            setattr(self, name, value + script.Style.BRIGHT if bright else value)
+
+
+_palette: Optional[_Colors] = None
+
+
+def _s():
+    """按需导入 script.py 并缓存
+    
+    Returns:
+        script 模块
+    """
+    global _script
+    if _script is None:
+        # 添加当前目录到路径，以便导入script.py中的函数
+        sys.path.insert(0, str(Path(__file__).parent))
+        try:
+            import script
+        except ImportError as e:
+            print(f"导入失败: {e}")
+            print("请确保script.py文件存在且可导入")
+            sys.exit(1)
+        _script = script
+    return _script
+
+
+def _colors() -> _Colors:
+    """获取颜色控制码（首次调用时导入 script.py）
+    
+    Returns:
+        _Colors 实例
+    """
+    global _palette
+    if _palette is None:
+        _palette = _Colors(_s())
+    return _palette
+
+
+def __getattr__(name):
+    """模块级延迟属性（PEP 562）：供外部以 C_* 名访问颜色常量，首次访问时才导入 script.py"""
+    if name.startswith('C_') and (name[2:] in _COLOR_SPECS or name == 'C_RESET'):
+        return getattr(_colors(), name[2:])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# 各演示段使用的分隔线
+_SEP50 = "=" * 50
+_SEP60 = "=" * 60
+
+
+# 演示节奏倍率：DEMO_SPEED=0 时跳过所有停顿，只测输出本身的开销
+SLEEP_SCALE = float(os.environ.get("DEMO_SPEED", "1.0"))
+
+
+def _sleep(seconds: float) -> None:
+    """按 SLEEP_SCALE 缩放后停顿"""
+    seconds *= SLEEP_SCALE
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def _format(text: str, color: str = '', style: str = '') -> str:
+    """生成彩色文本；非终端时返回纯文本"""
+    return _s().format_colored(text, color, style) if _TTY else text
+
+
+def _format_status(message: str, status: str = 'info', icon: str = '') -> str:
+    """生成状态文本；非终端时返回纯文本"""
+    s = _s()
+    if _TTY:
+        return s.format_status(message, status, icon)
+    return f"{icon or s.STATUS_ICONS.get(status, '')} {message}"
+
+
+def _format_block(text: str) -> str:
+    """处理 script.py 生成的整段文本；非终端时一次性去掉其中的控制码"""
+    return text if _TTY else _ANSI_RE.sub('', text)
+
+
+def _line(text: str, color: str = '', style: str = '') -> str:
+    """生成一行彩色文本（含换行）"""
+    return _format(text, color, style) + "\n"
+
+
+def _raw_fd() -> Optional[int]:
+    """返回可绕过文本层直接写入的标准输出文件描述符
+    
+    Windows下colorama在Python文本层完成控制码转换，不能绕过，返回None。
+    """
+    if os.name == 'nt':
+        return None
+    try:
+        return sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+def _write_all(fd: int, data) -> None:
+    """用 os.write 写出全部字节（处理部分写入）"""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _writer() -> Callable[[str], None]:
+    """返回一次性写出一整块文本的函数
+    
+    POSIX下编码后直接 os.write 到标准输出的文件描述符，绕过 print/TextIOWrapper；
+    其他情况经由 sys.stdout（保留colorama的转换）写出并立即刷新。
+    """
+    fd = _raw_fd()
+    if fd is None:
+        def write(text: str) -> None:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+    else:
+        sys.stdout.flush()  # 先写出文本层已缓冲的内容，保证输出顺序
+        
+        def write(text: str) -> None:
+            _write_all(fd, text.encode('utf-8'))
+    return write
+
+
+def _drive(chunks: Iterator[Chunk]) -> None:
+    """消费演示段产出的文本并按节奏写出
+    
+    相邻且之间没有停顿的文本合并为一次写入，写入次数不超过停顿次数+1。
+    
+    Args:
+        chunks: (文本, 之后的停顿秒数) 序列
+    """
+    write = _writer()
+    pending: List[str] = []
+    for text, delay in chunks:
+        pending.append(text)
+        if delay and SLEEP_SCALE > 0:
+            write("".join(pending))
+            pending.clear()
+            _sleep(delay)
+    if pending:
+        write("".join(pending))
 
-# 添加当前目录到路径，以便导入script.py中的函数
-sys.path.insert(0, str(Path(__file__).parent))
 
-try:
-    from script import (
-        print_banner, print_status, print_colored, print_progress_bar, 
-        print_summary_table, Fore, Style, COLORAMA_AVAILABLE
-    )
-except ImportError as e:
-    print(f"导入失败: {e}")
-    print("请确保script.py文件存在且可导入")
-    sys.exit(1)
+def _display_width(text: str) -> int:
+    """计算文本的终端显示宽度（全角字符占两列）"""
+    return sum(2 if unicodedata.east_asian_width(ch) in ('W', 'F') else 1 for ch in text)
 
 
-def demo_banner():
+class FastProgressBar:
+    """差量刷新的进度条
+    
+    首次绘制完整一帧，之后每次只补写新增的填充块并重写尾部计数，
+    颜色档位变化时才整帧重绘。仅在支持ANSI的终端上使用。
+    """
+    
+    def __init__(self, total: int, prefix: str = '', length: int = 50, fill: str = '█'):
+        self.total = total
+        self.prefix = prefix
+        self.length = length
+        self.fill = fill
+        self.filled = 0
+        self.color = None
+        self.bar_col = _display_width(f"{prefix} |")
+        
+        s = _s()
+        self.bands = (s.Fore.RED, s.Fore.YELLOW, s.Fore.GREEN)
+        self.reset = s.Style.RESET_ALL
+    
+    @staticmethod
+    def supported() -> bool:
+        """当前终端是否支持光标移动控制码"""
+        return _s().COLORAMA_AVAILABLE and _TTY
+    
+    def render(self, current: int, suffix: str = '') -> str:
+        """生成本次刷新需要写出的文本
+        
+        Args:
+            current: 当前进度
+            suffix: 后缀文本
+        
+        Returns:
+            差量刷新的控制码和文本，完成时以换行结尾
+        """
+        filled, percent = _s().progress_fill(current, self.total, self.length)
+        
+        # 与 print_progress_bar 相同的颜色档位
+        if percent < 0.3:
+            color = self.bands[0]
+        elif percent < 0.7:
+            color = self.bands[1]
+        else:
+            color = self.bands[2]
+        
+        tail = f"| {current}/{self.total} ({percent:.1%}) {suffix}{self.reset}\x1b[K"
+        if color != self.color or filled < self.filled:
+            bar = self.fill * filled + '-' * (self.length - filled)
+            frame = f"\r{color}{self.prefix} |{bar}{tail}"
+        else:
+            # 光标跳到第一个未填充格，只写新增的填充块，再跳过剩余空格写尾部
+            skip = self.bar_col + self.filled
+            rest = self.length - filled
+            frame = (
+                "\r" + (f"\x1b[{skip}C" if skip else "")
+                + color + self.fill * (filled - self.filled)
+                + (f"\x1b[{rest}C" if rest else "")
+                + tail
+            )
+        
+        self.filled = filled
+        self.color = color
+        
+        if current >= self.total:
+            frame += "\n"
+        return frame
+
+
+def demo_header() -> Iterator[Chunk]:
+    """演示标题"""
+    s = _s()
+    c = _colors()
+    yield _line("🎨 DDDD-RED 彩色输出效果演示", c.MAGENTA_B) + _line(_SEP60, c.MAGENTA), 0
+    
+    if not s.COLORAMA_AVAILABLE:
+        yield "⚠️  警告: 未安装colorama库，将显示无彩色版本\n建议运行: pip install colorama\n\n", 0
+
+
+def demo_banner() -> Iterator[Chunk]:
     """演示横幅显示"""
-    print_banner()
-    time.sleep(1)
+    yield _format_block(_s().format_banner()) + "\n", 1
 
 
-def demo_status_messages():
+def demo_status_messages() -> Iterator[Chunk]:
     """演示状态消息"""
-    print_colored("\n🎭 状态消息演示:", Fore.CYAN + Style.BRIGHT)
-    print_colored("="*50, Fore.CYAN)
+    c = _colors()
+    yield _line("\n🎭 状态消息演示:", c.CYAN_B) + _line(_SEP50, c.CYAN), 0
     
     status_demos = [
         ('info', '系统初始化完成'),
@@ -47,152 +307,189 @@ def demo_status_messages():
         ('success', '扫描任务完成: example.com')
     ]
     
+    fmt = _format_status  # 循环内使用局部名，省去重复的全局查找
     for status, message in status_demos:
-        print_status(message, status)
-        time.sleep(0.5)
+        yield fmt(message, status) + "\n", 0.5
 
 
-def demo_progress_bar():
+def demo_progress_bar() -> Iterator[Chunk]:
     """演示进度条"""
-    print_colored("\n📊 进度条演示:", Fore.CYAN + Style.BRIGHT)
-    print_colored("="*50, Fore.CYAN)
+    s = _s()
+    c = _colors()
+    yield _line("\n📊 进度条演示:", c.CYAN_B) + _line(_SEP50, c.CYAN), 0
     
     total = 20
-    for i in range(total + 1):
-        print_progress_bar(
-            i, total,
-            prefix='扫描进度',
-            suffix=f'已完成: {i}/{total} | 端口: {i*3} | 漏洞: {i//5}'
-        )
-        time.sleep(0.1)
-    
-    print()  # 换行
-
-
-def demo_configuration_display():
-    """演示配置信息显示"""
-    print_colored("\n📋 配置信息演示:", Fore.CYAN + Style.BRIGHT)
-    print_colored("="*50, Fore.CYAN)
-    
-    config_info = [
-        "  目标数量: 15",
-        "  扫描端口: 80,443,22,3389,8080,8443,9090",
-        "  扫描速率: 5000",
-        "  并发线程: 3",
-        "  超时时间: 30秒",
-        "  输出目录: scan_results",
-        "  代理设置: http://127.0.0.1:8080"
-    ]
+    bar = FastProgressBar(total, prefix='扫描进度') if FastProgressBar.supported() else None
+    suffixes = [f'已完成: {i}/{total} | 端口: {i*3} | 漏洞: {i//5}' for i in range(total + 1)]
+    for i, suffix in enumerate(suffixes):
+        if bar:
+            yield bar.render(i, suffix), 0.1
+        else:
+            yield _format_block(s.format_progress_bar(i, total, prefix='扫描进度', suffix=suffix)), 0.1
     
-    for info in config_info:
-        print_colored(info, Fore.WHITE)
-        time.sleep(0.3)
+    yield "\n", 0
+
+
+_DEMO_CONFIG_INFO = [
+    "  目标数量: 15",
+    "  扫描端口: 80,443,22,3389,8080,8443,9090",
+    "  扫描速率: 5000",
+    "  并发线程: 3",
+    "  超时时间: 30秒",
+    "  输出目录: scan_results",
+    "  代理设置: http://127.0.0.1:8080"
+]
+
+_DEMO_STATS = {
+    'total_targets': 15,
+    'completed_targets': 12,
+    'failed_targets': 3,
+    'total_ports': 45,
+    'total_vulnerabilities': 8,
+    'elapsed_time': 127.5
+}
+
+
+def _render_config_block() -> str:
+    """生成配置信息演示段的完整文本（整块着色）"""
+    c = _colors()
+    return "".join([
+        _line("\n📋 配置信息演示:", c.CYAN_B),
+        _line(_SEP50, c.CYAN),
+        _line("\n".join(_DEMO_CONFIG_INFO), c.WHITE)
+    ])
+
+
+def _render_summary_block() -> str:
+    """生成结果汇总演示段的完整文本"""
+    s = _s()
+    c = _colors()
+    return "".join([
+        _line("\n📈 结果汇总演示:", c.CYAN_B),
+        _format_block(s.format_summary_table(_DEMO_STATS)), "\n"
+    ])
 
 
-def demo_summary_table():
-    """演示汇总表格"""
-    print_colored("\n📈 结果汇总演示:", Fore.CYAN + Style.BRIGHT)
+def demo_configuration_display(block: Optional[Future] = None) -> Iterator[Chunk]:
+    """演示配置信息显示
     
-    demo_stats = {
-        'total_targets': 15,
-        'completed_targets': 12,
-        'failed_targets': 3,
-        'total_ports': 45,
-        'total_vulnerabilities': 8,
-        'elapsed_time': 127.5
-    }
+    Args:
+        block: 预先生成整段文本的任务（见 _render_config_block），仅在无停顿时使用
+    """
+    c = _colors()
+    if SLEEP_SCALE > 0:
+        # 需要逐行停顿展示时保留逐行输出
+        yield _line("\n📋 配置信息演示:", c.CYAN_B) + _line(_SEP50, c.CYAN), 0
+        for info in _DEMO_CONFIG_INFO:
+            yield _line(info, c.WHITE), 0.3
+    else:
+        # 无停顿时整块着色，一次写出
+        yield block.result() if block is not None else _render_config_block(), 0
+
+
+def demo_summary_table(block: Optional[Future] = None) -> Iterator[Chunk]:
+    """演示汇总表格
     
-    print_summary_table(demo_stats)
+    Args:
+        block: 预先生成整段文本的任务（见 _render_summary_block）
+    """
+    yield block.result() if block is not None else _render_summary_block(), 0
+
+
+# 扫描过程模拟的消息模板：键 -> (状态类型, 图标, 文本)
+_SCAN_MESSAGES = {
+    'masscan': ('info', '🔍', '开始Masscan端口扫描'),
+    'ports': ('success', '🎯', '发现 3 个开放端口'),
+    'rad': ('info', '🕷️', '开始Rad爬虫扫描'),
+    'urls': ('success', '🔗', '发现 12 个URL'),
+    'dddd': ('info', '🛡️', '开始dddd-red漏洞扫描'),
+    'vulns': ('warning', '🚨', '发现 2 个潜在漏洞'),
+    'clean': ('info', '🛡️', '未发现明显漏洞'),
+    'done': ('success', '🎉', '扫描完成'),
+    'no_ports': ('info', '🔒', '未发现开放端口，跳过后续扫描'),
+    'timeout': ('error', '❌', '连接超时'),
+}
+
+# 扫描场景：(消息键, 输出后的停顿秒数) 序列
+_SCENARIO_VULNERABLE = (
+    ('masscan', 0.5), ('ports', 0.3), ('rad', 0.5), ('urls', 0.3),
+    ('dddd', 1.0), ('vulns', 0), ('done', 0)
+)
+_SCENARIO_CLEAN = (
+    ('masscan', 0.5), ('ports', 0.3), ('rad', 0.5), ('urls', 0.3),
+    ('dddd', 1.0), ('clean', 0), ('done', 0)
+)
+_SCENARIO_NO_PORTS = (('masscan', 1.0), ('no_ports', 0))
+_SCENARIO_TIMEOUT = (('masscan', 1.0), ('timeout', 0))
+
+_DEMO_TARGETS = [
+    ("192.168.1.100", _SCENARIO_VULNERABLE),
+    ("example.com", _SCENARIO_NO_PORTS),
+    ("test.local", _SCENARIO_TIMEOUT),
+    ("10.0.0.50", _SCENARIO_CLEAN)
+]
 
 
-def demo_scan_simulation():
-    """演示扫描过程模拟"""
-    print_colored("\n🔍 扫描过程模拟:", Fore.CYAN + Style.BRIGHT)
-    print_colored("="*50, Fore.CYAN)
+def demo_scan_simulation() -> Iterator[Chunk]:
+    """演示扫描过程模拟
     
-    targets = [
-        "192.168.1.100",
-        "example.com",
-        "test.local",
-        "10.0.0.50"
-    ]
+    目标在开始前已知，所有消息行预先格式化，循环内只按场景表取用。
+    """
+    c = _colors()
+    yield _line("\n🔍 扫描过程模拟:", c.CYAN_B) + _line(_SEP50, c.CYAN), 0
     
-    for i, target in enumerate(targets):
-        print_status(f"[{target}] 开始Masscan端口扫描", 'info', '🔍')
-        time.sleep(0.5)
-        
-        if i % 3 == 0:  # 模拟发现端口
-            print_status(f"[{target}] 发现 3 个开放端口", 'success', '🎯')
-            time.sleep(0.3)
-            print_status(f"[{target}] 开始Rad爬虫扫描", 'info', '🕷️')
-            time.sleep(0.5)
-            print_status(f"[{target}] 发现 12 个URL", 'success', '🔗')
-            time.sleep(0.3)
-            print_status(f"[{target}] 开始dddd-red漏洞扫描", 'info', '🛡️')
-            time.sleep(0.5)
-            
-            if i == 0:  # 第一个目标发现漏洞
-                print_status(f"[{target}] 发现 2 个潜在漏洞", 'warning', '🚨')
-            else:
-                print_status(f"[{target}] 未发现明显漏洞", 'info', '🛡️')
-            
-            print_status(f"[{target}] 扫描完成", 'success', '🎉')
-        else:  # 模拟无端口或失败
-            if i % 2 == 1:
-                print_status(f"[{target}] 未发现开放端口，跳过后续扫描", 'info', '🔒')
-            else:
-                print_status(f"[{target}] 连接超时", 'error', '❌')
-        
-        time.sleep(0.5)
-        print()  # 空行分隔
+    blank = _line("")
+    for target, steps in _DEMO_TARGETS:
+        tprefix = f"[{target}]"
+        lines: Dict[str, str] = {
+            key: _format_status(f"{tprefix} {text}", status, icon) + "\n"
+            for key, (status, icon, text) in _SCAN_MESSAGES.items()
+        }
+        for key, delay in steps:
+            yield lines[key], delay
+        yield blank, 0  # 空行分隔
 
 
-def demo_completion():
+def demo_completion() -> Iterator[Chunk]:
     """演示完成信息"""
-    print_colored("\n🎉 扫描完成!", Fore.GREEN + Style.BRIGHT)
-    print_status("📁 结果保存在: /path/to/scan_results", 'success')
-    print_status("🚨 发现 2 个潜在漏洞，请及时处理!", 'warning')
+    c = _colors()
+    # 三行预先拼成一整块，一次写出
+    yield (
+        f"\n{c.GREEN_B}🎉 扫描完成!{c.RESET}\n"
+        f"{c.GREEN}✅ 📁 结果保存在: /path/to/scan_results{c.RESET}\n"
+        f"{c.YELLOW}⚠️ 🚨 发现 2 个潜在漏洞，请及时处理!{c.RESET}\n"
+    ), 0
+    yield _line("\n✨ 演示完成! 这就是优化后的扫描工具界面效果。", c.CYAN_B), 0
 
 
 def main():
     """主演示函数"""
-    print_colored("🎨 DDDD-RED 彩色输出效果演示", Fore.MAGENTA + Style.BRIGHT)
-    print_colored("="*60, Fore.MAGENTA)
-    
-    if not COLORAMA_AVAILABLE:
-        print("⚠️  警告: 未安装colorama库，将显示无彩色版本")
-        print("建议运行: pip install colorama")
-        print()
-    
+    c = _colors()
     try:
-        # 1. 横幅演示
-        demo_banner()
-        
-        # 2. 状态消息演示
-        demo_status_messages()
-        
-        # 3. 进度条演示
-        demo_progress_bar()
-        
-        # 4. 配置信息演示
-        demo_configuration_display()
-        
-        # 5. 扫描过程演示
-        demo_scan_simulation()
-        
-        # 6. 结果汇总演示
-        demo_summary_table()
-        
-        # 7. 完成信息演示
-        demo_completion()
-        
-        print_colored("\n✨ 演示完成! 这就是优化后的扫描工具界面效果。", Fore.CYAN + Style.BRIGHT)
-        
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            # 配置段和汇总段的文本与展示顺序无关，趁前面各段停顿时在后台预先生成；
+            # 配置段整块文本只在无停顿时使用
+            config_future = pool.submit(_render_config_block) if SLEEP_SCALE == 0 else None
+            summary_future = pool.submit(_render_summary_block)
+            
+            _drive(chain(
+                demo_header(),
+                demo_banner(),                                # 1. 横幅演示
+                demo_status_messages(),                       # 2. 状态消息演示
+                demo_progress_bar(),                          # 3. 进度条演示
+                demo_configuration_display(config_future),    # 4. 配置信息演示
+                demo_scan_simulation(),                       # 5. 扫描过程演示
+                demo_summary_table(summary_future),           # 6. 结果汇总演示
+                demo_completion()                             # 7. 完成信息演示
+            ))
+    
     except KeyboardInterrupt:
-        print_colored("\n\n⚠️  演示被用户中断", Fore.YELLOW + Style.BRIGHT)
+        _drive(iter([(_line("\n\n⚠️  演示被用户中断", c.YELLOW_B), 0)]))
     except Exception as e:
-        print_colored(f"\n❌ 演示过程中发生错误: {str(e)}", Fore.RED + Style.BRIGHT)
+        _drive(iter([(_line(f"\n❌ 演示过程中发生错误: {str(e)}", c.RED_B), 0)]))
+    finally:
+        sys.stdout.flush()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
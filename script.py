@@ -16,21 +16,27 @@
 
 依赖库：
     colorama>=0.4.4 (彩色输出支持)
+    orjson (可选，加速JSON解析和序列化)
 """
 
-import subprocess
+import asyncio
 import threading
 import os
 import sys
 import time
 import json
 import argparse
+import ipaddress
 import logging
-from queue import Queue
+import re
+import socket
+import ssl
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Union
 import shutil
+from dataclasses import dataclass
 
 # 尝试导入colorama用于彩色输出
 try:
@@ -46,6 +52,34 @@ except ImportError:
     Fore = Back = Style = _DummyColor()
     COLORAMA_AVAILABLE = False
 
+# 尝试导入orjson加速JSON解析和序列化，未安装时使用标准库json
+try:
+    import orjson
+    json_loads = orjson.loads
+    
+    def json_dumps(obj) -> bytes:
+        """序列化为缩进2格的UTF-8 JSON，datetime原生输出为ISO格式"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    
+    ORJSON_AVAILABLE = True
+except ImportError:
+    json_loads = json.loads
+    
+    def json_dumps(obj) -> bytes:
+        """序列化为缩进2格的UTF-8 JSON，datetime输出为ISO格式"""
+        return json.dumps(obj, ensure_ascii=False, indent=2,
+                          default=lambda o: o.isoformat()).encode('utf-8') + b'\n'
+    
+    ORJSON_AVAILABLE = False
+
+# dddd-red结果中的漏洞行（'vulnerability'同样包含'vuln'）
+_VULN_RE = re.compile(rb'(?im)^.*vuln.*$')
+
+# Masscan文本输出: Discovered open port 80/tcp on 192.168.1.1
+_MASSCAN_RE = re.compile(rb'Discovered open port (\d+)/(\w+) on (\S+)')
+
+logger = logging.getLogger(__name__)
+
 # -------------------------------
 # 彩色输出和格式化函数
 # -------------------------------
@@ -60,16 +94,24 @@ class ColoredFormatter(logging.Formatter):
         'CRITICAL': Fore.RED + Style.BRIGHT
     }
     
+    # 预先生成带颜色的级别名称，格式化时直接查表
+    COLORED_LEVELNAMES = {
+        level: f"{color}{level}{Style.RESET_ALL}" for level, color in COLORS.items()
+    }
+    
     def format(self, record):
-        if COLORAMA_AVAILABLE:
-            color = self.COLORS.get(record.levelname, '')
-            record.levelname = f"{color}{record.levelname}{Style.RESET_ALL}"
-        return super().format(record)
+        # 只在本次格式化期间替换级别名称，避免其他处理器（如文件日志）拿到颜色代码
+        levelname = record.levelname
+        record.levelname = self.COLORED_LEVELNAMES.get(levelname, levelname)
+        try:
+            return super().format(record)
+        finally:
+            record.levelname = levelname
 
 
-def print_banner() -> None:
-    """打印程序启动横幅"""
-    banner = f"""
+def format_banner() -> str:
+    """生成程序启动横幅文本（不输出）"""
+    return f"""
 {Fore.CYAN}{'='*70}
 {Fore.CYAN}██████╗ ███████╗██████╗     ████████╗███████╗ █████╗ ███╗   ███╗
 {Fore.CYAN}██╔══██╗██╔════╝██╔══██╗    ╚══██╔══╝██╔════╝██╔══██╗████╗ ████║
@@ -81,7 +123,27 @@ def print_banner() -> None:
 {Fore.GREEN}        集成 Masscan + Rad + dddd-red + 16000+指纹库
 {Fore.CYAN}{'='*70}{Style.RESET_ALL}
     """
-    print(banner)
+
+
+def print_banner() -> None:
+    """打印程序启动横幅"""
+    print(format_banner())
+
+
+def format_colored(text: str, color: str = '', style: str = '') -> str:
+    """生成彩色文本（不输出）
+    
+    Args:
+        text: 文本内容
+        color: 颜色（如 Fore.RED）
+        style: 样式（如 Style.BRIGHT）
+        
+    Returns:
+        带颜色控制码的文本，无colorama时原样返回
+    """
+    if COLORAMA_AVAILABLE:
+        return f"{color}{style}{text}{Style.RESET_ALL}"
+    return text
 
 
 def print_colored(text: str, color: str = '', style: str = '', end: str = '\n') -> None:
@@ -93,10 +155,39 @@ def print_colored(text: str, color: str = '', style: str = '', end: str = '\n')
         style: 样式（如 Style.BRIGHT）
         end: 结束符
     """
-    if COLORAMA_AVAILABLE:
-        print(f"{color}{style}{text}{Style.RESET_ALL}", end=end)
-    else:
-        print(text, end=end)
+    print(format_colored(text, color, style), end=end)
+
+
+STATUS_COLORS = {
+    'info': Fore.CYAN,
+    'success': Fore.GREEN,
+    'warning': Fore.YELLOW,
+    'error': Fore.RED
+}
+
+STATUS_ICONS = {
+    'info': '🔍',
+    'success': '✅',
+    'warning': '⚠️',
+    'error': '❌'
+}
+
+
+def format_status(message: str, status: str = 'info', icon: str = '') -> str:
+    """生成状态信息文本（不输出）
+    
+    Args:
+        message: 状态消息
+        status: 状态类型 (info, success, warning, error)
+        icon: 图标
+        
+    Returns:
+        带图标和颜色的状态文本
+    """
+    color = STATUS_COLORS.get(status, Fore.WHITE)
+    display_icon = icon or STATUS_ICONS.get(status, '')
+    
+    return format_colored(f"{display_icon} {message}", color)
 
 
 def print_status(message: str, status: str = 'info', icon: str = '') -> None:
@@ -107,24 +198,130 @@ def print_status(message: str, status: str = 'info', icon: str = '') -> None:
         status: 状态类型 (info, success, warning, error)
         icon: 图标
     """
-    colors = {
-        'info': Fore.CYAN,
-        'success': Fore.GREEN,
-        'warning': Fore.YELLOW,
-        'error': Fore.RED
-    }
+    print(format_status(message, status, icon))
+
+
+def _progress_fill_py(current: int, total: int, length: int) -> tuple:
+    """进度条计算的纯Python实现"""
+    if total == 0:
+        return 0, 0.0
+    percent = current / total
+    return int(length * percent), percent
+
+
+_progress_fill_impl = None
+
+
+def progress_fill(current: int, total: int, length: int = 50) -> tuple:
+    """计算进度条的填充格数和完成比例
     
-    icons = {
-        'info': '🔍',
-        'success': '✅',
-        'warning': '⚠️',
-        'error': '❌'
-    }
+    首次调用时尝试用Numba编译（cache=True，编译结果跨运行复用），
+    未安装Numba时退回纯Python实现。
     
-    color = colors.get(status, Fore.WHITE)
-    display_icon = icon or icons.get(status, '')
+    Args:
+        current: 当前进度
+        total: 总数
+        length: 进度条长度
+        
+    Returns:
+        (填充格数, 完成比例 0-1)
+    """
+    global _progress_fill_impl
+    if _progress_fill_impl is None:
+        try:
+            from numba import njit
+            _progress_fill_impl = njit(cache=True)(_progress_fill_py)
+        except ImportError:
+            _progress_fill_impl = _progress_fill_py
+    return _progress_fill_impl(current, total, length)
+
+
+def _progress_color(percent: float) -> str:
+    """根据进度选择颜色"""
+    if percent < 0.3:
+        return Fore.RED
+    elif percent < 0.7:
+        return Fore.YELLOW
+    return Fore.GREEN
+
+
+class _ByteProgressBar:
+    """直接输出字节的进度条，复用同一个条形缓冲区，只改写变化的格子"""
     
-    print_colored(f"{display_icon} {message}", color)
+    def __init__(self, length: int, fill: str):
+        self.length = length
+        self.fill = fill
+        self.fill_bytes = fill.encode('utf-8')
+        self.bar = bytearray(b'-' * length)
+        self.filled = 0
+        self.color = None
+        self.color_bytes = b''
+        
+    def render(self, current: int, total: int, prefix: str, suffix: str) -> bytes:
+        """生成一帧进度条字节
+        
+        Args:
+            current: 当前进度
+            total: 总数
+            prefix: 前缀文本
+            suffix: 后缀文本
+            
+        Returns:
+            以回车开头的进度条字节，完成时以换行结尾
+        """
+        filled_length, percent = progress_fill(current, total, self.length)
+        
+        if filled_length < self.filled:
+            self.bar = bytearray(b'-' * self.length)
+            self.filled = 0
+        if filled_length > self.filled:
+            # 前filled格为多字节填充字符，其后每格一个字节的'-'
+            start = self.filled * len(self.fill_bytes)
+            grow = filled_length - self.filled
+            self.bar[start:start + grow] = self.fill_bytes * grow
+            self.filled = filled_length
+        
+        # 颜色只在跨过阈值时重新编码
+        color = _progress_color(percent) if COLORAMA_AVAILABLE else ''
+        if color != self.color:
+            self.color = color
+            self.color_bytes = color.encode('ascii')
+        
+        reset = Style.RESET_ALL.encode('ascii') if COLORAMA_AVAILABLE else b''
+        return b''.join((
+            self.color_bytes, b'\r', prefix.encode('utf-8'), b' |', self.bar,
+            f'| {current}/{total} ({percent:.1%}) {suffix}'.encode('utf-8'), reset,
+            b'\n' if current == total else b''  # 完成时换行
+        ))
+
+
+_byte_progress_bar = None
+
+
+def format_progress_bar(current: int, total: int, prefix: str = '', suffix: str = '', 
+                        length: int = 50, fill: str = '█') -> str:
+    """生成进度条文本（不输出）
+    
+    Args:
+        current: 当前进度
+        total: 总数
+        prefix: 前缀文本
+        suffix: 后缀文本
+        length: 进度条长度
+        fill: 填充字符
+        
+    Returns:
+        以回车开头的进度条文本，完成时以换行结尾
+    """
+    filled_length, percent = progress_fill(current, total, length)
+    bar = fill * filled_length + '-' * (length - filled_length)
+    
+    text = format_colored(f'\r{prefix} |{bar}| {current}/{total} ({percent:.1%}) {suffix}',
+                          _progress_color(percent))
+    
+    if current == total:
+        text += '\n'  # 完成时换行
+    return text
 
 
 def print_progress_bar(current: int, total: int, prefix: str = '', suffix: str = '', 
@@ -139,37 +336,37 @@ def print_progress_bar(current: int, total: int, prefix: str = '', suffix: str =
         length: 进度条长度
         fill: 填充字符
     """
-    if total == 0:
-        percent = 0
-    else:
-        percent = current / total
-    
-    filled_length = int(length * percent)
-    bar = fill * filled_length + '-' * (length - filled_length)
+    global _byte_progress_bar
+    buffer = getattr(sys.stdout, 'buffer', None)
     
-    # 根据进度选择颜色
-    if percent < 0.3:
-        color = Fore.RED
-    elif percent < 0.7:
-        color = Fore.YELLOW
-    else:
-        color = Fore.GREEN
+    # Windows控制台需要colorama转换颜色代码，输出被重定向时需要去掉颜色代码，都走文本层
+    if os.name == 'nt' or buffer is None or not sys.stdout.isatty():
+        print(format_progress_bar(current, total, prefix, suffix, length, fill), end='')
+        return
     
-    print_colored(f'\r{prefix} |{bar}| {current}/{total} ({percent:.1%}) {suffix}', color, end='')
+    if (_byte_progress_bar is None or _byte_progress_bar.length != length
+            or _byte_progress_bar.fill != fill):
+        _byte_progress_bar = _ByteProgressBar(length, fill)
     
-    if current == total:
-        print()  # 完成时换行
+    sys.stdout.flush()  # 先输出文本层中尚未写出的内容，保证顺序
+    buffer.write(_byte_progress_bar.render(current, total, prefix, suffix))
+    buffer.flush()
 
 
-def print_summary_table(stats: Dict) -> None:
-    """打印扫描结果汇总表
+def format_summary_table(stats: Dict) -> str:
+    """生成扫描结果汇总表文本（不输出）
     
     Args:
         stats: 统计数据字典
+        
+    Returns:
+        多行汇总表文本
     """
-    print_colored("\n" + "="*60, Fore.CYAN)
-    print_colored("📊 扫描结果汇总", Fore.CYAN, Style.BRIGHT)
-    print_colored("="*60, Fore.CYAN)
+    lines = [
+        format_colored("\n" + "="*60, Fore.CYAN),
+        format_colored("📊 扫描结果汇总", Fore.CYAN, Style.BRIGHT),
+        format_colored("="*60, Fore.CYAN)
+    ]
     
     table_data = [
         ("总目标数", stats.get('total_targets', 0)),
@@ -181,9 +378,19 @@ def print_summary_table(stats: Dict) -> None:
     ]
     
     for label, value in table_data:
-        print_colored(f"  {label:<12}: {value}", Fore.WHITE)
+        lines.append(format_colored(f"  {label:<12}: {value}", Fore.WHITE))
+    
+    lines.append(format_colored("="*60, Fore.CYAN))
+    return "\n".join(lines)
+
+
+def print_summary_table(stats: Dict) -> None:
+    """打印扫描结果汇总表
     
-    print_colored("="*60, Fore.CYAN)
+    Args:
+        stats: 统计数据字典
+    """
+    print(format_summary_table(stats))
 
 
 def get_terminal_width() -> int:
@@ -298,8 +505,8 @@ class ScanStats:
         self.failed_targets = 0
         self.total_ports = 0
         self.total_vulnerabilities = 0
-        self.start_time = time.time()
-        self.lock = threading.Lock()
+        self.start_time = time.monotonic()  # 只用于计算耗时，不受系统时间调整影响
+        self.cond = threading.Condition()  # 状态变化时通知进度监控
         
     def add_completed_target(self, ports_found: int = 0, vulns_found: int = 0) -> None:
         """添加完成的目标统计
@@ -308,15 +515,17 @@ class ScanStats:
             ports_found: 发现的端口数
             vulns_found: 发现的漏洞数
         """
-        with self.lock:
+        with self.cond:
             self.completed_targets += 1
             self.total_ports += ports_found
             self.total_vulnerabilities += vulns_found
+            self.cond.notify_all()
             
     def add_failed_target(self) -> None:
         """添加失败的目标统计"""
-        with self.lock:
+        with self.cond:
             self.failed_targets += 1
+            self.cond.notify_all()
             
     def get_progress(self) -> float:
         """获取扫描进度
@@ -324,7 +533,7 @@ class ScanStats:
         Returns:
             进度百分比 (0-1)
         """
-        with self.lock:
+        with self.cond:
             if self.total_targets == 0:
                 return 0.0
             return (self.completed_targets + self.failed_targets) / self.total_targets
@@ -335,7 +544,7 @@ class ScanStats:
         Returns:
             已用时间（秒）
         """
-        return time.time() - self.start_time
+        return time.monotonic() - self.start_time
         
     def to_dict(self) -> Dict:
         """转换为字典格式
@@ -343,213 +552,581 @@ class ScanStats:
         Returns:
             统计信息字典
         """
-        with self.lock:
-            return {
-                'total_targets': self.total_targets,
-                'completed_targets': self.completed_targets,
-                'failed_targets': self.failed_targets,
-                'total_ports': self.total_ports,
-                'total_vulnerabilities': self.total_vulnerabilities,
-                'elapsed_time': self.get_elapsed_time()
-            }
+        with self.cond:
+            return self._snapshot()
+    
+    def wait_for_change(self, last_done: int, timeout: float = 1.0) -> Optional[Dict]:
+        """等待已结束（完成或失败）的目标数发生变化
+        
+        等待和读取在同一次加锁内完成，调用方拿到的是一致的快照。
+        
+        Args:
+            last_done: 上次看到的已结束目标数
+            timeout: 最长等待时间（秒）
+            
+        Returns:
+            统计信息字典，超时或被wake()唤醒且没有变化时返回None
+        """
+        with self.cond:
+            if self.completed_targets + self.failed_targets == last_done:
+                self.cond.wait(timeout)
+                if self.completed_targets + self.failed_targets == last_done:
+                    return None
+            return self._snapshot()
+    
+    def wake(self) -> None:
+        """唤醒所有在wait_for_change中等待的线程"""
+        with self.cond:
+            self.cond.notify_all()
+    
+    def _snapshot(self) -> Dict:
+        """生成统计信息字典，调用方需持有self.cond"""
+        return {
+            'total_targets': self.total_targets,
+            'completed_targets': self.completed_targets,
+            'failed_targets': self.failed_targets,
+            'total_ports': self.total_ports,
+            'total_vulnerabilities': self.total_vulnerabilities,
+            'elapsed_time': self.get_elapsed_time()
+        }
+
+
+# -------------------------------
+# 目标上下文
+# -------------------------------
+@dataclass
+class TargetCtx:
+    """单个目标的目录名、各结果文件路径和预解析的IP，每个目标只计算一次"""
+    
+    __slots__ = ('raw', 'slug', 'target_dir', 'masscan_path', 'dddd_targets_path',
+                 'rad_result_path', 'dddd_result_path', 'json_result_path', 'ips')
+    
+    raw: str
+    slug: str
+    target_dir: str
+    masscan_path: str
+    dddd_targets_path: str
+    rad_result_path: str
+    dddd_result_path: str
+    json_result_path: str
+    ips: List[str]  # 域名目标预解析得到的IP
+    
+    @classmethod
+    def from_target(cls, target: str, output_dir: str) -> 'TargetCtx':
+        """根据目标地址和输出目录构建上下文
+        
+        Args:
+            target: 目标地址
+            output_dir: 输出目录
+            
+        Returns:
+            目标上下文
+        """
+        slug = target.replace('/', '_').replace(':', '_')
+        target_dir = os.path.join(output_dir, slug)
+        return cls(
+            raw=target,
+            slug=slug,
+            target_dir=target_dir,
+            masscan_path=os.path.join(target_dir, 'masscan_result.txt'),
+            dddd_targets_path=os.path.join(target_dir, 'dddd_targets.txt'),
+            rad_result_path=os.path.join(target_dir, 'rad_result.txt'),
+            dddd_result_path=os.path.join(target_dir, 'dddd_result.txt'),
+            json_result_path=os.path.join(output_dir, f"{slug}_result.json"),
+            ips=[]
+        )
 
 
 # -------------------------------
 # 核心扫描函数
 # -------------------------------
-def run_command_with_timeout(cmd: List[str], timeout: int = 30, cwd: str = None) -> tuple:
-    """执行命令并设置超时
+async def _drain_lines(proc: asyncio.subprocess.Process,
+                       on_stdout_line: Callable[[bytes], None]) -> tuple:
+    """逐行读取标准输出交给回调，同时读取标准错误
+    
+    Args:
+        proc: 子进程
+        on_stdout_line: 标准输出行回调
+        
+    Returns:
+        (空标准输出, 标准错误)
+    """
+    stderr_task = asyncio.ensure_future(proc.stderr.read())
+    try:
+        async for line in proc.stdout:
+            on_stdout_line(line)
+        stderr = await stderr_task
+    finally:
+        stderr_task.cancel()
+    await proc.wait()
+    return b'', stderr
+
+
+async def run_command_async(cmd: List[str], timeout: int = 30, cwd: str = None,
+                            on_stdout_line: Optional[Callable[[bytes], None]] = None) -> tuple:
+    """异步执行命令并设置超时
     
     Args:
         cmd: 命令列表
         timeout: 超时时间（秒）
         cwd: 工作目录
+        on_stdout_line: 标准输出行回调，指定时边读边处理，不在内存中保留标准输出
         
     Returns:
         (返回码, 标准输出, 标准错误)
     """
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            cwd=cwd,
-            encoding='utf-8',
-            errors='ignore'
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd
         )
-        return result.returncode, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return -1, "", f"命令执行超时 ({timeout}秒)"
     except Exception as e:
         return -1, "", f"命令执行失败: {str(e)}"
+    
+    try:
+        if on_stdout_line is None:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        else:
+            stdout, stderr = await asyncio.wait_for(_drain_lines(proc, on_stdout_line), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return -1, "", f"命令执行超时 ({timeout}秒)"
+    except asyncio.CancelledError:
+        # 用户中断时不留下孤儿进程
+        proc.kill()
+        raise
+    
+    return (proc.returncode,
+            stdout.decode('utf-8', errors='ignore'),
+            stderr.decode('utf-8', errors='ignore'))
 
 
-def parse_masscan_output(output: str) -> List[Dict]:
-    """解析Masscan输出结果
+def parse_masscan_output(output: bytes) -> List[Dict]:
+    """解析Masscan文本输出结果
     
     Args:
-        output: Masscan输出文本
+        output: Masscan输出内容（字节）
         
     Returns:
         端口信息列表
     """
-    ports = []
-    for line in output.strip().split('\n'):
-        if line.strip() and 'open' in line:
-            try:
-                # 解析格式: Discovered open port 80/tcp on 192.168.1.1
-                parts = line.split()
-                if len(parts) >= 6:
-                    port_info = parts[3]  # 80/tcp
-                    ip = parts[5]  # 192.168.1.1
-                    port, protocol = port_info.split('/')
-                    ports.append({
-                        'ip': ip,
-                        'port': int(port),
-                        'protocol': protocol,
-                        'status': 'open'
-                    })
-            except (ValueError, IndexError):
+    return [
+        {
+            'ip': ip.decode('ascii', errors='ignore'),
+            'port': int(port),
+            'protocol': protocol.decode('ascii'),
+            'status': 'open'
+        }
+        for port, protocol, ip in _MASSCAN_RE.findall(output)
+    ]
+
+
+def _masscan_record_ports(record: Dict) -> List[Dict]:
+    """把一条Masscan JSON记录转换为端口信息列表"""
+    if 'ip' not in record:
+        return []
+    return [
+        {
+            'ip': record['ip'],
+            'port': int(port_info['port']),
+            'protocol': port_info.get('proto', 'tcp'),
+            'status': 'open'
+        }
+        for port_info in record.get('ports', [])
+        if port_info.get('status', 'open') == 'open'
+    ]
+
+
+def parse_masscan_line(line: bytes) -> List[Dict]:
+    """解析单行Masscan输出，JSON记录和文本格式均可
+    
+    Args:
+        line: Masscan输出的一行
+        
+    Returns:
+        端口信息列表
+    """
+    line = line.strip().rstrip(b',')
+    if line.startswith(b'{'):
+        try:
+            return _masscan_record_ports(json_loads(line))
+        except ValueError:
+            return []
+    return parse_masscan_output(line)
+
+
+# 域名解析缓存文件和有效期（秒）
+DNS_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'dddd_red_resolve.json')
+DNS_CACHE_TTL = 3600
+
+# 每个目标同时进行的TLS探测连接数上限
+TLS_PROBE_CONCURRENCY = 32
+
+
+@lru_cache(maxsize=None)
+def _tls_client_hello(server_hostname: Optional[str] = None) -> bytes:
+    """生成一个标准的TLS ClientHello（由ssl模块构造，每个SNI主机名只生成一次）"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    outgoing = ssl.MemoryBIO()
+    tls = context.wrap_bio(ssl.MemoryBIO(), outgoing, server_hostname=server_hostname)
+    try:
+        tls.do_handshake()
+    except ssl.SSLWantReadError:
+        pass
+    return outgoing.read()
+
+
+async def probe_scheme(ip: str, port: int, timeout: float = 1.0,
+                       server_hostname: Optional[str] = None) -> Optional[str]:
+    """发送TLS ClientHello探测端口协议
+    
+    响应首字节为TLS握手(0x16)或告警(0x15)记录即为HTTPS，其他响应视为HTTP。
+    连接被直接关闭时无法判断（TLS服务也可能丢弃不接受的ClientHello）。
+    
+    Args:
+        ip: IP地址
+        port: 端口
+        timeout: 连接和读取超时（秒）
+        server_hostname: ClientHello中携带的SNI主机名，按域名路由的HTTPS站点需要
+        
+    Returns:
+        'https'或'http'，连接失败、超时或未收到响应时返回None
+    """
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    
+    try:
+        writer.write(_tls_client_hello(server_hostname))
+        first = await asyncio.wait_for(reader.read(1), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    finally:
+        writer.close()
+    
+    if not first:
+        return None
+    if first[0] in (0x15, 0x16):
+        return 'https'
+    return 'http'
+
+
+async def resolve_schemes(ports_found: List[Dict],
+                          server_hostname: Optional[str] = None) -> Dict[tuple, tuple]:
+    """并发探测所有端口应使用的URL协议
+    
+    Args:
+        ports_found: 端口信息列表
+        server_hostname: 域名目标的主机名，探测时作为SNI发送
+        
+    Returns:
+        {(ip, 端口): 协议元组}，探测失败的端口沿用默认规则（443/8443同时使用http和https）
+    """
+    sem = asyncio.Semaphore(TLS_PROBE_CONCURRENCY)
+    
+    async def probe(ip: str, port: int) -> tuple:
+        async with sem:
+            scheme = await probe_scheme(ip, port, server_hostname=server_hostname)
+        if scheme:
+            return (scheme,)
+        return ('http', 'https') if port in (443, 8443) else ('http',)
+    
+    endpoints = list(dict.fromkeys((p['ip'], p['port']) for p in ports_found))
+    schemes = await asyncio.gather(*[probe(ip, port) for ip, port in endpoints])
+    return dict(zip(endpoints, schemes))
+
+
+def _target_network(target: str) -> Optional[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    """把目标解析为IP网络，域名等无法解析的目标返回None"""
+    try:
+        return ipaddress.ip_network(target, strict=False)
+    except ValueError:
+        return None
+
+
+def _valid_dns_entry(entry) -> bool:
+    """检查缓存条目是否为 {'ips': [IPv4地址], 'expires': 过期时间戳}"""
+    if not isinstance(entry, dict):
+        return False
+    ips, expires = entry.get('ips'), entry.get('expires')
+    if not isinstance(ips, list) or isinstance(expires, bool) or not isinstance(expires, (int, float)):
+        return False
+    try:
+        return all(ipaddress.ip_address(ip if isinstance(ip, str) else '').version == 4 for ip in ips)
+    except ValueError:
+        return False
+
+
+def _load_dns_cache() -> Dict:
+    """读取域名解析缓存，文件不存在或损坏时返回空字典，格式不对的条目视为未缓存"""
+    try:
+        with open(DNS_CACHE_FILE, 'rb') as f:
+            cache = json_loads(f.read())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict):
+        return {}
+    return {host: entry for host, entry in cache.items() if _valid_dns_entry(entry)}
+
+
+def _save_dns_cache(cache: Dict) -> None:
+    """保存域名解析缓存，写入失败时忽略"""
+    try:
+        os.makedirs(os.path.dirname(DNS_CACHE_FILE), exist_ok=True)
+        with open(DNS_CACHE_FILE, 'wb') as f:
+            f.write(json_dumps(cache))
+    except OSError:
+        pass
+
+
+async def resolve_targets(ctxs: List[TargetCtx]) -> None:
+    """并发解析所有域名目标的IPv4地址，结果写入ctx.ips
+    
+    解析结果按DNS_CACHE_TTL缓存到DNS_CACHE_FILE，缓存未过期的域名不再重复解析。
+    
+    Args:
+        ctxs: 目标上下文列表
+    """
+    hosts = list(dict.fromkeys(ctx.raw for ctx in ctxs if _target_network(ctx.raw) is None))
+    if not hosts:
+        return
+    
+    now = time.time()
+    cache = _load_dns_cache()
+    pending = [host for host in hosts if cache.get(host, {}).get('expires', 0) <= now]
+    
+    if pending:
+        print_status(f"解析 {len(pending)} 个域名目标", 'info', '🌐')
+        loop = asyncio.get_running_loop()
+        answers = await asyncio.gather(
+            # 只取IPv4：IPv6地址会让不支持IPv6的主机或旧版Masscan整批扫描失败
+            *[loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+              for host in pending],
+            return_exceptions=True
+        )
+        for host, answer in zip(pending, answers):
+            if isinstance(answer, Exception):
+                # 解析失败不缓存，下次运行重试
+                cache.pop(host, None)
                 continue
-    return ports
+            cache[host] = {
+                'ips': list(dict.fromkeys(info[4][0] for info in answer)),
+                'expires': now + DNS_CACHE_TTL
+            }
+        _save_dns_cache(cache)
+    
+    for ctx in ctxs:
+        entry = cache.get(ctx.raw)
+        if entry:
+            ctx.ips = entry['ips']
+
+
+async def run_masscan_bulk(ctxs: List[TargetCtx], config: ScanConfig, output_dir: str,
+                           ports: str, rate: int, timeout: int) -> tuple:
+    """用一次Masscan调用扫描全部目标，再按IP把端口分配回各目标
+    
+    Args:
+        ctxs: 目标上下文列表（IP、CIDR或已解析的域名）
+        config: 扫描配置
+        output_dir: 输出目录
+        ports: 端口列表
+        rate: 扫描速率
+        timeout: 单个目标的超时时间，总超时按目标数放大
+        
+    Returns:
+        (返回码, 标准错误, {目标: 端口信息列表})
+    """
+    # 域名目标扫描其解析出的IP
+    specs = [(spec, ctx.raw) for ctx in ctxs for spec in (ctx.ips or [ctx.raw])]
+    include_file = os.path.join(output_dir, 'masscan_targets.txt')
+    write_file_once(include_file, ''.join(dict.fromkeys(f"{spec}\n" for spec, _ in specs)))
+    
+    # 单个IP直接查表，网段逐个判断包含关系；同一IP可能属于多个目标
+    exact = {}
+    networks = []
+    for spec, target in specs:
+        network = _target_network(spec)
+        if network.num_addresses == 1:
+            exact.setdefault(str(network.network_address), []).append(target)
+        else:
+            networks.append((network, target))
+    
+    masscan_cmd = [
+        config.masscan_path,
+        '--include-file', include_file,
+        '-p', ports,
+        '--rate', str(rate),
+        '--wait', '3',
+        '-oJ', '-'
+    ]
+    
+    ports_by_target = {ctx.raw: [] for ctx in ctxs}
+    with open(os.path.join(output_dir, 'masscan_result.txt'), 'wb') as masscan_out:
+        def on_masscan_line(line: bytes) -> None:
+            masscan_out.write(line)
+            for port_info in parse_masscan_line(line):
+                # 同时属于单IP目标和网段目标的IP要分给所有目标
+                owners = list(exact.get(port_info['ip'], ()))
+                if networks:
+                    ip = ipaddress.ip_address(port_info['ip'])
+                    owners.extend(t for network, t in networks if ip in network)
+                for target in dict.fromkeys(owners):
+                    ports_by_target[target].append(port_info)
+        
+        returncode, _, stderr = await run_command_async(
+            masscan_cmd, timeout * len(ctxs), on_stdout_line=on_masscan_line)
+    
+    return returncode, stderr, ports_by_target
 
 
-def scan_target(target: str, config: ScanConfig, stats: ScanStats, 
-               output_dir: str, ports: str, rate: int, timeout: int, 
-               proxy: Optional[str] = None) -> Dict:
+async def scan_target_async(ctx: TargetCtx, sem: asyncio.Semaphore, config: ScanConfig,
+                            stats: ScanStats, ports: str, rate: int, timeout: int,
+                            proxy: Optional[str] = None,
+                            bulk_ports: Optional[List[Dict]] = None,
+                            tls_probe: bool = True) -> Dict:
     """扫描单个目标
     
     Args:
-        target: 目标地址
+        ctx: 目标上下文
+        sem: 并发控制信号量
         config: 扫描配置
         stats: 统计信息
-        output_dir: 输出目录
         ports: 端口列表
         rate: 扫描速率
         timeout: 超时时间
         proxy: 代理设置
+        bulk_ports: 批量Masscan已发现的端口，为None时单独运行Masscan
+        tls_probe: 是否探测TLS以确定每个端口的URL协议
         
     Returns:
         扫描结果字典
     """
-    result = {
+    async with sem:
+        try:
+            return await _scan_target(ctx, config, stats, ports, rate, timeout, proxy,
+                                      bulk_ports, tls_probe)
+        except Exception as e:
+            # 兜底：未预料的异常只让当前目标失败，不会中断gather中其他目标的扫描
+            logger.exception("扫描目标 %s 时发生未处理的异常", ctx.raw)
+            stats.add_failed_target()
+            result = new_result(ctx.raw)
+            result['errors'].append(f"未处理的异常: {str(e)}")
+            return result
+
+
+def ns_to_datetime(ns: int) -> datetime:
+    """把time.time_ns()时间戳转换为本地时间datetime（保留微秒，不经过浮点数）"""
+    seconds, remainder = divmod(ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=remainder // 1000)
+
+
+def result_for_output(result: Dict) -> Dict:
+    """生成用于写出的结果副本，时间戳转换为datetime，由json_dumps输出为ISO格式
+    
+    Args:
+        result: 扫描结果字典
+        
+    Returns:
+        浅拷贝的结果字典
+    """
+    return {**result, 'timestamp': ns_to_datetime(result['timestamp'])}
+
+
+def new_result(target: str) -> Dict:
+    """生成单个目标的初始扫描结果
+    
+    Args:
+        target: 目标地址
+        
+    Returns:
+        各阶段均为未运行状态的结果字典
+    """
+    return {
         'target': target,
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': time.time_ns(),  # 写出时再转换为ISO格式
         'status': 'failed',
         'masscan': {'status': 'not_run', 'ports': []},
         'rad': {'status': 'not_run', 'urls': []},
         'dddd': {'status': 'not_run', 'vulnerabilities': []},
         'errors': []
     }
+
+
+async def _scan_target(ctx: TargetCtx, config: ScanConfig, stats: ScanStats,
+                       ports: str, rate: int, timeout: int,
+                       proxy: Optional[str], bulk_ports: Optional[List[Dict]],
+                       tls_probe: bool) -> Dict:
+    """依次执行Masscan、Rad、dddd-red三个阶段，参数同scan_target_async"""
+    target = ctx.raw
+    result = new_result(target)
     
     try:
         # 创建目标专用目录
-        target_dir = os.path.join(output_dir, target.replace('/', '_').replace(':', '_'))
-        os.makedirs(target_dir, exist_ok=True)
-        
-        # 阶段1: Masscan端口扫描
-        print_status(f"[{target}] 开始Masscan端口扫描", 'info', '🔍')
-        masscan_cmd = [
-            config.masscan_path,
-            target,
-            '-p', ports,
-            '--rate', str(rate),
-            '--wait', '3'
-        ]
+        os.makedirs(ctx.target_dir, exist_ok=True)
         
-        returncode, stdout, stderr = run_command_with_timeout(masscan_cmd, timeout)
+        # 阶段1: Masscan端口扫描（已批量扫描时直接使用结果）
+        if bulk_ports is None:
+            print_status(f"[{target}] 开始Masscan端口扫描", 'info', '🔍')
+            masscan_cmd = [
+                config.masscan_path,
+                ','.join(ctx.ips) if ctx.ips else target,  # 域名使用预解析的IP
+                '-p', ports,
+                '--rate', str(rate),
+                '--wait', '3',
+                '-oJ', '-'  # JSON格式输出到标准输出
+            ]
+            
+            # 边读取边保存Masscan结果并解析端口信息
+            ports_found = []
+            with open(ctx.masscan_path, 'wb') as masscan_out:
+                def on_masscan_line(line: bytes) -> None:
+                    masscan_out.write(line)
+                    ports_found.extend(parse_masscan_line(line))
+                
+                returncode, stdout, stderr = await run_command_async(
+                    masscan_cmd, timeout, on_stdout_line=on_masscan_line)
+        else:
+            returncode, stderr, ports_found = 0, '', bulk_ports
         
         if returncode == 0:
             print_status(f"[{target}] Masscan扫描完成", 'success', '✅')
             result['masscan']['status'] = 'completed'
-            
-            # 保存Masscan结果
-            masscan_file = os.path.join(target_dir, 'masscan_result.txt')
-            with open(masscan_file, 'w', encoding='utf-8') as f:
-                f.write(stdout)
-            
-            # 解析端口信息
-            ports_found = parse_masscan_output(stdout)
             result['masscan']['ports'] = ports_found
             
             if ports_found:
                 print_status(f"[{target}] 发现 {len(ports_found)} 个开放端口", 'success', '🎯')
                 
-                # 生成dddd-red目标文件
-                dddd_targets_file = os.path.join(target_dir, 'dddd_targets.txt')
-                with open(dddd_targets_file, 'w', encoding='utf-8') as f:
-                    for port_info in ports_found:
-                        f.write(f"http://{port_info['ip']}:{port_info['port']}\n")
-                        if port_info['port'] in [443, 8443]:  # HTTPS端口
-                            f.write(f"https://{port_info['ip']}:{port_info['port']}\n")
-                
-                # 阶段2: Rad爬虫扫描
-                print_status(f"[{target}] 开始Rad爬虫扫描", 'info', '🕷️')
-                rad_cmd = [
-                    config.rad_path,
-                    '--target-file', dddd_targets_file,
-                    '--text-output', os.path.join(target_dir, 'rad_result.txt')
-                ]
-                
-                if proxy:
-                    rad_cmd.extend(['--proxy', proxy])
-                
-                returncode, stdout, stderr = run_command_with_timeout(rad_cmd, timeout)
+                # 域名目标的URL保留主机名，Rad和dddd-red按域名访问虚拟主机和SNI站点
+                hostname = target if ctx.ips else None
                 
-                if returncode == 0:
-                    print_status(f"[{target}] Rad爬虫扫描完成", 'success', '✅')
-                    result['rad']['status'] = 'completed'
-                    
-                    # 读取Rad结果
-                    rad_result_file = os.path.join(target_dir, 'rad_result.txt')
-                    if os.path.exists(rad_result_file):
-                        with open(rad_result_file, 'r', encoding='utf-8') as f:
-                            urls = [line.strip() for line in f if line.strip()]
-                            result['rad']['urls'] = urls
-                            print_status(f"[{target}] 发现 {len(urls)} 个URL", 'success', '🔗')
+                # 确定每个端口的协议：探测TLS，或443/8443同时使用http和https
+                if tls_probe:
+                    schemes = await resolve_schemes(ports_found, hostname)
                 else:
-                    print_status(f"[{target}] Rad扫描失败: {stderr}", 'warning', '⚠️')
-                    result['rad']['status'] = 'failed'
-                    result['errors'].append(f"Rad扫描失败: {stderr}")
+                    schemes = {}
                 
-                # 阶段3: dddd-red漏洞扫描
-                print_status(f"[{target}] 开始dddd-red漏洞扫描", 'info', '🛡️')
-                dddd_cmd = [
-                    config.dddd_path,
-                    '-t', dddd_targets_file,
-                    '-o', os.path.join(target_dir, 'dddd_result.txt')
-                ]
+                # 生成dddd-red目标文件（按首次出现顺序去重，避免重复扫描同一URL）
+                urls = dict.fromkeys(
+                    f"{scheme}://{hostname or port_info['ip']}:{port_info['port']}\n"
+                    for port_info in ports_found
+                    for scheme in schemes.get(
+                        (port_info['ip'], port_info['port']),
+                        ('http', 'https') if port_info['port'] in (443, 8443) else ('http',)  # HTTPS端口
+                    )
+                )
+                write_file_once(ctx.dddd_targets_path, ''.join(urls))
                 
-                if proxy:
-                    dddd_cmd.extend(['--proxy', proxy])
-                
-                returncode, stdout, stderr = run_command_with_timeout(dddd_cmd, timeout * 2)  # dddd-red需要更长时间
-                
-                if returncode == 0:
-                    print_status(f"[{target}] dddd-red扫描完成", 'success', '✅')
-                    result['dddd']['status'] = 'completed'
-                    
-                    # 读取dddd-red结果
-                    dddd_result_file = os.path.join(target_dir, 'dddd_result.txt')
-                    if os.path.exists(dddd_result_file):
-                        with open(dddd_result_file, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            # 简单解析漏洞信息（根据实际输出格式调整）
-                            vulns = []
-                            for line in content.split('\n'):
-                                if 'vulnerability' in line.lower() or 'vuln' in line.lower():
-                                    vulns.append(line.strip())
-                            result['dddd']['vulnerabilities'] = vulns
-                            
-                            if vulns:
-                                print_status(f"[{target}] 发现 {len(vulns)} 个潜在漏洞", 'warning', '🚨')
-                            else:
-                                print_status(f"[{target}] 未发现明显漏洞", 'info', '🛡️')
-                else:
-                    print_status(f"[{target}] dddd-red扫描失败: {stderr}", 'warning', '⚠️')
-                    result['dddd']['status'] = 'failed'
-                    result['errors'].append(f"dddd-red扫描失败: {stderr}")
+                # 阶段2和阶段3: Rad和dddd-red读取同一个目标文件、互不依赖，同时运行
+                await asyncio.gather(
+                    _run_rad(ctx, config, result, timeout, proxy),
+                    _run_dddd(ctx, config, result, timeout, proxy)
+                )
             else:
                 print_status(f"[{target}] 未发现开放端口，跳过后续扫描", 'info', '🔒')
         else:
@@ -560,9 +1137,8 @@ def scan_target(target: str, config: ScanConfig, stats: ScanStats,
             return result
         
         # 保存单个目标的结果
-        result_file = os.path.join(output_dir, f"{target.replace('/', '_').replace(':', '_')}_result.json")
-        with open(result_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        with open(ctx.json_result_path, 'wb') as f:
+            f.write(json_dumps(result_for_output(result)))
         
         result['status'] = 'completed'
         
@@ -576,73 +1152,174 @@ def scan_target(target: str, config: ScanConfig, stats: ScanStats,
     except Exception as e:
         error_msg = f"扫描目标 {target} 时发生错误: {str(e)}"
         print_status(error_msg, 'error', '❌')
+        logger.debug("扫描目标 %s 的异常堆栈", target, exc_info=True)
         result['errors'].append(error_msg)
         stats.add_failed_target()
     
     return result
 
 
-# -------------------------------
-# 工作线程和进度监控
-# -------------------------------
-def worker(task_queue: Queue, results: List, config: ScanConfig, stats: ScanStats,
-          output_dir: str, ports: str, rate: int, timeout: int, proxy: Optional[str]) -> None:
-    """工作线程函数
+async def _run_rad(ctx: TargetCtx, config: ScanConfig, result: Dict, timeout: int,
+                   proxy: Optional[str]) -> None:
+    """阶段2: Rad爬虫扫描，结果写入result['rad']"""
+    target = ctx.raw
+    print_status(f"[{target}] 开始Rad爬虫扫描", 'info', '🕷️')
+    rad_cmd = [
+        config.rad_path,
+        '--target-file', ctx.dddd_targets_path,
+        '--text-output', ctx.rad_result_path
+    ]
     
-    Args:
-        task_queue: 任务队列
-        results: 结果列表
-        config: 扫描配置
-        stats: 统计信息
-        output_dir: 输出目录
-        ports: 端口列表
-        rate: 扫描速率
-        timeout: 超时时间
-        proxy: 代理设置
-    """
-    while True:
+    if proxy:
+        rad_cmd.extend(['--proxy', proxy])
+    
+    returncode, stdout, stderr = await run_command_async(rad_cmd, timeout)
+    
+    if returncode == 0:
+        print_status(f"[{target}] Rad爬虫扫描完成", 'success', '✅')
+        result['rad']['status'] = 'completed'
+        
+        # 读取Rad结果（工具刚运行完，直接打开，不存在时再提示）
         try:
-            target = task_queue.get(timeout=1)
-            if target is None:
-                break
-                
-            result = scan_target(target, config, stats, output_dir, ports, rate, timeout, proxy)
-            results.append(result)
+            with open(ctx.rad_result_path, 'r', encoding='utf-8') as f:
+                urls = [line.strip() for line in f if line.strip()]
+                result['rad']['urls'] = urls
+                print_status(f"[{target}] 发现 {len(urls)} 个URL", 'success', '🔗')
+        except FileNotFoundError:
+            print_status(f"[{target}] Rad未生成结果文件", 'info', '🔗')
+    else:
+        print_status(f"[{target}] Rad扫描失败: {stderr}", 'warning', '⚠️')
+        result['rad']['status'] = 'failed'
+        result['errors'].append(f"Rad扫描失败: {stderr}")
+
+
+async def _run_dddd(ctx: TargetCtx, config: ScanConfig, result: Dict, timeout: int,
+                    proxy: Optional[str]) -> None:
+    """阶段3: dddd-red漏洞扫描，结果写入result['dddd']"""
+    target = ctx.raw
+    print_status(f"[{target}] 开始dddd-red漏洞扫描", 'info', '🛡️')
+    dddd_cmd = [
+        config.dddd_path,
+        '-t', ctx.dddd_targets_path,
+        '-o', ctx.dddd_result_path
+    ]
+    
+    if proxy:
+        dddd_cmd.extend(['--proxy', proxy])
+    
+    returncode, stdout, stderr = await run_command_async(dddd_cmd, timeout * 2)  # dddd-red需要更长时间
+    
+    if returncode == 0:
+        print_status(f"[{target}] dddd-red扫描完成", 'success', '✅')
+        result['dddd']['status'] = 'completed'
+        
+        # 读取dddd-red结果
+        try:
+            with open(ctx.dddd_result_path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            print_status(f"[{target}] dddd-red未生成结果文件", 'info', '🛡️')
+        else:
+            # 简单解析漏洞信息（根据实际输出格式调整）
+            vulns = [m.group(0).decode('utf-8', errors='ignore').strip()
+                     for m in _VULN_RE.finditer(content)]
+            result['dddd']['vulnerabilities'] = vulns
             
-            task_queue.task_done()
-        except:
-            break
+            if vulns:
+                print_status(f"[{target}] 发现 {len(vulns)} 个潜在漏洞", 'warning', '🚨')
+            else:
+                print_status(f"[{target}] 未发现明显漏洞", 'info', '🛡️')
+    else:
+        print_status(f"[{target}] dddd-red扫描失败: {stderr}", 'warning', '⚠️')
+        result['dddd']['status'] = 'failed'
+        result['errors'].append(f"dddd-red扫描失败: {stderr}")
 
 
+# -------------------------------
+# 并发调度和进度监控
+# -------------------------------
 def progress_monitor(stats: ScanStats, stop_event: threading.Event) -> None:
-    """进度监控线程
+    """进度监控线程，在条件变量上等待，只在统计变化时重绘
     
     Args:
         stats: 统计信息
         stop_event: 停止事件
     """
-    last_progress = -1
+    last_done = -1
     
     while not stop_event.is_set():
-        current_progress = stats.get_progress()
-        
-        # 只在进度变化时更新显示
-        if abs(current_progress - last_progress) > 0.01:  # 1%的变化
-            with stats.lock:
-                completed = stats.completed_targets
-                total = stats.total_targets
-                ports = stats.total_ports
-                vulns = stats.total_vulnerabilities
-                elapsed = stats.get_elapsed_time()
-            
-            print_progress_bar(
-                completed, total,
-                prefix='扫描进度',
-                suffix=f'已完成: {completed}/{total} | 端口: {ports} | 漏洞: {vulns} | 耗时: {elapsed:.1f}s'
-            )
-            last_progress = current_progress
+        # 等待期间的多次完成合并为一次重绘
+        snapshot = stats.wait_for_change(last_done)
+        if snapshot is None:
+            continue
         
-        time.sleep(0.5)
+        completed = snapshot['completed_targets']
+        total = snapshot['total_targets']
+        print_progress_bar(
+            completed, total,
+            prefix='扫描进度',
+            suffix=(f"已完成: {completed}/{total} | 端口: {snapshot['total_ports']} | "
+                    f"漏洞: {snapshot['total_vulnerabilities']} | 耗时: {snapshot['elapsed_time']:.1f}s")
+        )
+        last_done = completed + snapshot['failed_targets']
+
+
+async def run_scan(ctxs: List[TargetCtx], config: ScanConfig, stats: ScanStats,
+                   args: argparse.Namespace) -> List[Dict]:
+    """在单个事件循环中并发扫描全部目标
+    
+    Args:
+        ctxs: 目标上下文列表
+        config: 扫描配置
+        stats: 统计信息
+        args: 命令行参数
+        
+    Returns:
+        扫描结果列表
+    """
+    sem = asyncio.Semaphore(args.threads)
+    stop_event = threading.Event()
+    monitor = threading.Thread(target=progress_monitor, args=(stats, stop_event))
+    monitor.daemon = True
+    monitor.start()
+    
+    try:
+        # 预先并发解析域名，Masscan只接受IP；解析出错时域名目标按未解析处理，单独扫描
+        try:
+            await resolve_targets(ctxs)
+        except Exception as e:
+            logger.exception("域名预解析失败")
+            print_status(f"域名预解析失败，域名目标改为单独扫描: {str(e)}", 'warning', '⚠️')
+            for ctx in ctxs:
+                ctx.ips = []
+        
+        # IP/网段和已解析的域名目标合并为一次Masscan扫描
+        bulk_ports = {}
+        bulk_targets = [] if args.per_target_masscan else [
+            ctx for ctx in ctxs if ctx.ips or _target_network(ctx.raw) is not None
+        ]
+        if bulk_targets:
+            print_status(f"批量Masscan扫描 {len(bulk_targets)} 个目标", 'info', '🔍')
+            returncode, stderr, ports_by_target = await run_masscan_bulk(
+                bulk_targets, config, args.output, args.ports, args.rate, args.timeout)
+            if returncode == 0:
+                bulk_ports = ports_by_target
+            else:
+                print_status(f"批量Masscan扫描失败，改为逐个目标扫描: {stderr}", 'warning', '⚠️')
+        
+        results = await asyncio.gather(*[
+            scan_target_async(ctx, sem, config, stats, args.ports, args.rate,
+                              args.timeout, args.proxy, bulk_ports.get(ctx.raw),
+                              not args.no_tls_probe)
+            for ctx in ctxs
+        ])
+    finally:
+        # 停止进度监控
+        stop_event.set()
+        stats.wake()
+        monitor.join(timeout=1)
+    
+    return list(results)
 
 
 # -------------------------------
@@ -671,6 +1348,23 @@ def load_targets(target_file: str) -> List[str]:
     return targets
 
 
+def write_file_once(path: str, data: str) -> None:
+    """用一次os.write写入整个文件内容
+    
+    Args:
+        path: 文件路径
+        data: 文件内容
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+    fd = os.open(path, flags, 0o644)
+    try:
+        view = memoryview(data.encode('utf-8'))
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
 def save_final_report(results: List[Dict], output_dir: str, stats: ScanStats) -> None:
     """保存最终扫描报告
     
@@ -679,21 +1373,21 @@ def save_final_report(results: List[Dict], output_dir: str, stats: ScanStats) ->
         output_dir: 输出目录
         stats: 统计信息
     """
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    report_file = os.path.join(output_dir, f'scan_report_{timestamp}.json')
+    now = datetime.now()
+    report_file = os.path.join(output_dir, f"scan_report_{now.strftime('%Y%m%d_%H%M%S')}.json")
     
     report = {
         'scan_info': {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now,
             'total_targets': len(results),
             'statistics': stats.to_dict()
         },
-        'results': results
+        'results': [result_for_output(result) for result in results]
     }
     
     try:
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        with open(report_file, 'wb') as f:
+            f.write(json_dumps(report))
         print_status(f"扫描报告已保存: {report_file}", 'success')
     except Exception as e:
         print_status(f"保存扫描报告失败: {str(e)}", 'error')
@@ -724,9 +1418,13 @@ def main() -> None:
     parser.add_argument('-r', '--rate', type=int, default=5000,
                        help='Masscan扫描速率 (默认: 5000)')
     parser.add_argument('--threads', type=int, default=3,
-                       help='并发线程数 (默认: 3)')
+                       help='最大并发扫描目标数 (默认: 3)')
     parser.add_argument('--timeout', type=int, default=30,
                        help='单个工具超时时间/秒 (默认: 30)')
+    parser.add_argument('--per-target-masscan', action='store_true',
+                       help='每个目标单独运行Masscan (默认合并为一次扫描)')
+    parser.add_argument('--no-tls-probe', action='store_true',
+                       help='不探测TLS，443/8443端口同时生成http和https目标')
     parser.add_argument('--proxy',
                        help='代理设置 (例: http://127.0.0.1:8080)')
     parser.add_argument('--verbose', action='store_true',
@@ -774,7 +1472,7 @@ def main() -> None:
         f"  目标数量: {len(targets)}",
         f"  扫描端口: {args.ports}",
         f"  扫描速率: {args.rate}",
-        f"  并发线程: {args.threads}",
+        f"  并发目标: {args.threads}",
         f"  超时时间: {args.timeout}秒",
         f"  输出目录: {args.output}"
     ]
@@ -788,48 +1486,12 @@ def main() -> None:
     stats = ScanStats()
     stats.total_targets = len(targets)
     
-    # 创建任务队列和结果列表
-    task_queue = Queue()
-    results = []
-    
-    # 添加任务到队列
-    for target in targets:
-        task_queue.put(target)
-    
-    # 启动进度监控
-    stop_event = threading.Event()
-    progress_thread = threading.Thread(
-        target=progress_monitor,
-        args=(stats, stop_event)
-    )
-    progress_thread.daemon = True
-    progress_thread.start()
-    
     print_status("\n开始扫描...", 'info', '🚀')
     
     try:
-        # 启动工作线程
-        threads = []
-        for i in range(args.threads):
-            t = threading.Thread(
-                target=worker,
-                args=(task_queue, results, config, stats, args.output, 
-                     args.ports, args.rate, args.timeout, args.proxy)
-            )
-            t.daemon = True
-            t.start()
-            threads.append(t)
-        
-        # 等待所有任务完成
-        task_queue.join()
-        
-        # 停止进度监控
-        stop_event.set()
-        progress_thread.join(timeout=1)
-        
-        # 等待所有线程结束
-        for t in threads:
-            t.join(timeout=1)
+        # 单个事件循环驱动所有目标，信号量限制并发数
+        ctxs = [TargetCtx.from_target(target, args.output) for target in targets]
+        results = asyncio.run(run_scan(ctxs, config, stats, args))
         
         print_colored("\n🎉 扫描完成!", Fore.GREEN, Style.BRIGHT)
         
@@ -848,13 +1510,8 @@ def main() -> None:
         
     except KeyboardInterrupt:
         print_colored("\n\n⚠️  用户中断扫描", Fore.YELLOW, Style.BRIGHT)
-        stop_event.set()
     except Exception as e:
         print_status(f"扫描过程中发生错误: {str(e)}", 'error')
-        stop_event.set()
-    finally:
-        # 确保进度监控线程停止
-        stop_event.set()
 
 
 if __name__ == "__main__":